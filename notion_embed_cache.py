@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Shared embedding cache used by both the ingest and search scripts
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """Persistent embedding cache backed by SQLite, keyed by SHA-256 of (model_id, text)"""
+
+    def __init__(self, path='embedding_cache.sqlite'):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")  # Allow concurrent reads
+        self.conn.execute("CREATE TABLE IF NOT EXISTS emb (key BLOB PRIMARY KEY, vec BLOB)")
+        # Secondary table keyed by a normalized-text fingerprint so texts that
+        # differ only in case/whitespace reuse the same embedding
+        self.conn.execute("CREATE TABLE IF NOT EXISTS emb_norm (key BLOB PRIMARY KEY, vec BLOB)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+        # Commit in batches - an fsync per embedding would dominate put() time
+        self._pending = 0
+        self._commit_every = 32
+
+    @staticmethod
+    def make_key(model_id, text):
+        """Build the cache key from model ID and text"""
+        return hashlib.sha256(f"{model_id}\0{text}".encode()).digest()
+
+    @staticmethod
+    def normalize_text(text):
+        """Lowercase and collapse whitespace to fingerprint near-duplicate texts"""
+        return ' '.join(text.lower().split())
+
+    @staticmethod
+    def encode_vector(embedding):
+        """Quantize a vector to int8 with a per-vector scale (4x smaller than float32)"""
+        vec = np.asarray(embedding, dtype=np.float32)
+        scale = float(np.abs(vec).max()) / 127.0 or 1.0
+        quantized = np.clip(np.round(vec / scale), -128, 127).astype(np.int8)
+        return np.float32(scale).tobytes() + quantized.tobytes()
+
+    @staticmethod
+    def decode_vector(blob):
+        """Dequantize a stored vector back to a float32 array"""
+        scale = np.frombuffer(blob, dtype=np.float32, count=1)[0]
+        quantized = np.frombuffer(blob, dtype=np.int8, offset=4)
+        return quantized.astype(np.float32) * scale
+
+    def get_near_duplicate(self, model_id, text):
+        """Return the embedding of a near-duplicate cached text, or None"""
+        key = self.make_key(model_id, self.normalize_text(text))
+        with self.lock:
+            row = self.conn.execute("SELECT vec FROM emb_norm WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return self.decode_vector(row[0])
+
+    def get(self, model_id, text):
+        """Return the cached embedding for this text, or None on miss"""
+        key = self.make_key(model_id, text)
+        with self.lock:
+            row = self.conn.execute("SELECT vec FROM emb WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _stats['misses'] += 1
+            return None
+        _stats['hits'] += 1
+        return self.decode_vector(row[0])
+
+    def put(self, model_id, text, embedding):
+        """Store an embedding, ignoring duplicates"""
+        key = self.make_key(model_id, text)
+        norm_key = self.make_key(model_id, self.normalize_text(text))
+        vec = self.encode_vector(embedding)
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO emb (key, vec) VALUES (?, ?)", (key, vec))
+            self.conn.execute("INSERT OR IGNORE INTO emb_norm (key, vec) VALUES (?, ?)", (norm_key, vec))
+            self._pending += 1
+            if self._pending >= self._commit_every:
+                self.conn.commit()
+                self._pending = 0
+
+    def flush(self):
+        """Commit any writes still buffered from batched puts"""
+        with self.lock:
+            if self._pending:
+                self.conn.commit()
+                self._pending = 0
+
+_embedding_cache = None
+
+# In-process memo so repeated texts in one run skip even the SQLite lookup
+_MEMO_MAX_SIZE = 4096
+_embedding_memo = OrderedDict()
+_embedding_memo_lock = threading.Lock()
+
+# Hit/miss counts across both tiers, reported at shutdown
+_stats = {'hits': 0, 'misses': 0}
+
+def memo_get(model_id, text):
+    """Return a memoized embedding for this run, or None"""
+    with _embedding_memo_lock:
+        embedding = _embedding_memo.get((model_id, text))
+        if embedding is not None:
+            _embedding_memo.move_to_end((model_id, text))
+            _stats['hits'] += 1
+        return embedding
+
+def memo_put(model_id, text, embedding):
+    """Memoize an embedding, evicting the least recently used entry when full"""
+    with _embedding_memo_lock:
+        _embedding_memo[(model_id, text)] = embedding
+        if len(_embedding_memo) > _MEMO_MAX_SIZE:
+            _embedding_memo.popitem(last=False)
+
+def _log_stats():
+    """Report cache effectiveness once at shutdown"""
+    total = _stats['hits'] + _stats['misses']
+    if total:
+        logger.debug("Embedding cache: %d hit(s), %d miss(es) (%.0f%% hit rate)",
+                     _stats['hits'], _stats['misses'], 100 * _stats['hits'] / total)
+
+def get_embedding_cache():
+    """Open the on-disk embedding cache once and reuse it for all lookups"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        try:
+            _embedding_cache = EmbeddingCache(os.getenv('EMBEDDING_CACHE_PATH', 'embedding_cache.sqlite'))
+            # Writes are committed in batches, so land the tail on exit
+            atexit.register(_embedding_cache.flush)
+            atexit.register(_log_stats)
+        except Exception as e:
+            print(f"⚠️  Embedding cache unavailable, calling Bedrock for every text: {e}")
+            _embedding_cache = False
+    return _embedding_cache or None
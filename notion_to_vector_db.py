@@ -3,67 +3,110 @@
 Script to extract Notion data, generate embeddings, and store in DataStax Astra DB vector database
 """
 
+import io
 import os
 import sys
-import json
-import boto3
+import time
+import logging
+import functools
+import random
+import queue
+import threading
+from dataclasses import dataclass
+import numpy as np
+import orjson
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from dotenv import load_dotenv
-from notion_client import Client
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
-from astrapy.db import AstraDB
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from notion_embed_cache import memo_get, memo_put, get_embedding_cache
+
+# boto3, notion_client, astrapy and langchain_text_splitters are imported
+# lazily inside their factory functions - together they add most of a second
+# of start-up time, which dominates no-op incremental runs
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True, slots=True)
+class PipelineConfig:
+    """Pipeline configuration loaded once from the environment"""
+    notion_secret: str
+    notion_connection: str
+    aws_access_key: str
+    aws_secret_key: str
+    aws_region: str
+    bedrock_model_id: str
+    astra_db_endpoint: str
+    astra_db_keyspace: str
+    astra_db_application_token: str
+    astra_db_name: str
+    vector_collection_name: str
+    chunk_size: int
 
 def load_environment():
-    """Load environment variables from .env file"""
+    """Load environment variables from .env file into a PipelineConfig"""
     load_dotenv()
-    
+
     # Notion credentials
     notion_secret = os.getenv('NOTION_SECRET')
-    notion_connection = os.getenv('NOTION_CONNECTION')
-    
+
     # AWS Bedrock credentials
     aws_access_key = os.getenv('AWS_ACCESS_KEY')
     aws_secret_key = os.getenv('AWS_SECRET_KEY')
-    aws_region = os.getenv('AWS_REGION', 'us-east-1')
-    bedrock_model_id = os.getenv('BEDROCK_MODEL_ID', 'amazon.titan-embed-text-v1')
-    
+
     # Astra DB credentials
     astra_db_endpoint = os.getenv('ASTRA_DB_ENDPOINT')
     astra_db_keyspace = os.getenv('ASTRA_DB_KEYSPACE')
     astra_db_application_token = os.getenv('ASTRA_DB_APPLICATION_TOKEN')
-    astra_db_name = os.getenv('ASTRA_DB_NAME')
-    vector_collection_name = os.getenv('VECTOR_COLLECTION_NAME')
-    
-    # Chunking configuration
-    chunk_size = int(os.getenv('CHUNK_SIZE', '1000'))  # Default 1000 tokens
-    
+
     # Validate required credentials
     if not notion_secret:
         print("❌ NOTION_SECRET not found in .env file")
-        return None, None, None, None, None, None, None, None, None, None, None
-    
+        return None
+
     if not aws_access_key or not aws_secret_key:
         print("❌ AWS credentials not found in .env file")
-        return None, None, None, None, None, None, None, None, None, None, None
-    
+        return None
+
     if not astra_db_endpoint or not astra_db_keyspace or not astra_db_application_token:
         print("❌ Astra DB credentials not found in .env file")
         print("Please add: ASTRA_DB_ENDPOINT, ASTRA_DB_KEYSPACE, ASTRA_DB_APPLICATION_TOKEN")
-        return None, None, None, None, None, None, None, None, None, None, None
-    
-    return (notion_secret, notion_connection, aws_access_key, aws_secret_key, 
-            aws_region, bedrock_model_id, astra_db_endpoint, astra_db_keyspace, 
-            astra_db_application_token, astra_db_name, vector_collection_name, chunk_size)
+        return None
+
+    return PipelineConfig(
+        notion_secret=notion_secret,
+        notion_connection=os.getenv('NOTION_CONNECTION'),
+        aws_access_key=aws_access_key,
+        aws_secret_key=aws_secret_key,
+        aws_region=os.getenv('AWS_REGION', 'us-east-1'),
+        bedrock_model_id=os.getenv('BEDROCK_MODEL_ID', 'amazon.titan-embed-text-v1'),
+        astra_db_endpoint=astra_db_endpoint,
+        astra_db_keyspace=astra_db_keyspace,
+        astra_db_application_token=astra_db_application_token,
+        astra_db_name=os.getenv('ASTRA_DB_NAME'),
+        vector_collection_name=os.getenv('VECTOR_COLLECTION_NAME'),
+        chunk_size=int(os.getenv('CHUNK_SIZE', '1000'))  # Default 1000 tokens
+    )
 
 def create_bedrock_client(aws_access_key, aws_secret_key, aws_region):
     """Create and configure Bedrock client"""
     try:
+        import boto3
+
         bedrock_client = boto3.client(
             service_name='bedrock-runtime',
             region_name=aws_region,
             aws_access_key_id=aws_access_key,
-            aws_secret_access_key=aws_secret_key
+            aws_secret_access_key=aws_secret_key,
+            # Size the connection pool for concurrent invoke_model calls and
+            # let botocore throttle adaptively when Bedrock pushes back
+            config=Config(
+                max_pool_connections=32,
+                tcp_keepalive=True,
+                retries={'max_attempts': 10, 'mode': 'adaptive'}
+            )
         )
         print(f"✅ Bedrock client created successfully")
         return bedrock_client
@@ -71,25 +114,165 @@ def create_bedrock_client(aws_access_key, aws_secret_key, aws_region):
         print(f"❌ Error creating Bedrock client: {e}")
         return None
 
-def get_embedding(bedrock_client, text, model_id):
-    """Get embedding for a given text using Bedrock"""
+def _l2_normalize(embedding):
+    """Scale a vector to unit length so cosine similarity is a dot product"""
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm else embedding
+
+# invoke_model request headers never change; build the dict once
+_INVOKE_CONSTANT_KWARGS = {'accept': 'application/json', 'contentType': 'application/json'}
+
+def _embed_dimensions(model_id):
+    """Requested output dimensions for models that support it, or None
+
+    EMBED_DIMENSIONS applies only to Titan v2, which accepts 256/512/1024.
+    """
+    dimensions = os.getenv('EMBED_DIMENSIONS')
+    if dimensions and model_id.startswith('amazon.titan-embed-text-v2'):
+        return int(dimensions)
+    return None
+
+# Titan's input limit is ~8k tokens; at roughly 4 chars/token this is a
+# safe character budget that avoids a doomed API call for oversized pages
+_MAX_EMBED_CHARS = 32000
+
+def get_embedding(bedrock_client, text, model_id, latency='standard'):
+    """Get embedding for a given text using Bedrock
+
+    Pass latency='optimized' for interactive single queries to request
+    Bedrock's latency-optimized inference; the default 'standard' keeps
+    the throughput path unchanged.
+    """
+    # Titan rejects inputs beyond ~8k tokens after a full round-trip, so
+    # pre-truncate with a ~4 chars/token heuristic instead
+    if len(text) > _MAX_EMBED_CHARS:
+        logger.warning("Truncating %d-char text to %d chars before embedding",
+                       len(text), _MAX_EMBED_CHARS)
+        text = text[:_MAX_EMBED_CHARS]
+
+    # Duplicate texts within a run are served straight from memory
+    memoized = memo_get(model_id, text)
+    if memoized is not None:
+        return memoized
+
+    # Cache hit avoids the network round-trip (and API cost) entirely
+    cache = get_embedding_cache()
+    if cache:
+        cached = cache.get(model_id, text)
+        if cached is None:
+            # Texts differing only in case/whitespace embed near-identically,
+            # so reuse the cached vector instead of calling Bedrock
+            cached = cache.get_near_duplicate(model_id, text)
+        if cached is not None:
+            memo_put(model_id, text, cached)
+            return cached
+
     try:
-        request_body = {"inputText": text}
-        body = json.dumps(request_body)
-        
-        response = bedrock_client.invoke_model(
-            modelId=model_id,
-            body=body
-        )
+        payload = {"inputText": text}
+        # Titan v2 can return reduced-dimension vectors - smaller documents
+        # and faster similarity search at a small recall cost
+        dimensions = _embed_dimensions(model_id)
+        if dimensions:
+            payload["dimensions"] = dimensions
+        # orjson emits bytes, which invoke_model accepts directly
+        body = orjson.dumps(payload)
+
+        # BEDROCK_LATENCY_OPTIMIZED=1 opts the whole run in; not every model
+        # supports it, so fall back to standard on ValidationException
+        if latency == 'standard' and os.getenv('BEDROCK_LATENCY_OPTIMIZED') == '1':
+            latency = 'optimized'
+
+        invoke_kwargs = {'modelId': model_id, 'body': body, **_INVOKE_CONSTANT_KWARGS}
+        if latency == 'optimized':
+            invoke_kwargs['performanceConfigLatency'] = 'optimized'
+
+        try:
+            response = bedrock_client.invoke_model(**invoke_kwargs)
+        except ClientError as e:
+            if latency == 'optimized' and e.response.get('Error', {}).get('Code') == 'ValidationException':
+                print(f"   ⚠️  Model {model_id} does not support latency-optimized inference, using standard")
+                invoke_kwargs.pop('performanceConfigLatency')
+                response = bedrock_client.invoke_model(**invoke_kwargs)
+            else:
+                raise
         
-        response_body = json.loads(response['body'].read())
-        embedding = response_body.get('embedding', [])
+        # orjson parses the float-heavy embedding payload several times
+        # faster than stdlib json
+        response_body = orjson.loads(response['body'].read())
+        # float32 arrays keep embeddings compact (4 bytes/dim vs 28-byte
+        # PyFloat objects) and make downstream similarity math a BLAS call.
+        # Unit length is semantics-preserving under the collection's cosine
+        # metric and lets local scorers skip the norm division
+        embedding = _l2_normalize(np.asarray(response_body.get('embedding', []), dtype=np.float32))
+
+        if embedding.size:
+            memo_put(model_id, text, embedding)
+            if cache:
+                cache.put(model_id, text, embedding)
+
         return embedding
-        
+
     except Exception as e:
         print(f"❌ Error getting embedding: {e}")
         return None
 
+# Cohere embed models accept up to 96 texts per invoke_model call
+_COHERE_BATCH_SIZE = 96
+
+def get_embeddings_batch(bedrock_client, texts, model_id):
+    """
+    Get embeddings for multiple texts, batching natively where the model allows.
+
+    Titan models take one text per call, so they go through get_embedding
+    (and its caches). Cohere embed models accept up to 96 texts per call,
+    turning 96 round-trips into one.
+
+    Args:
+        bedrock_client: Bedrock client
+        texts (list): Texts to embed
+        model_id (str): Bedrock model ID
+
+    Returns:
+        list: Embeddings aligned with texts (None entries for failures)
+    """
+    if not model_id.startswith('cohere.embed'):
+        return [get_embedding(bedrock_client, text, model_id) for text in texts]
+
+    embeddings = []
+    try:
+        for start in range(0, len(texts), _COHERE_BATCH_SIZE):
+            batch = texts[start:start + _COHERE_BATCH_SIZE]
+            body = orjson.dumps({"texts": batch, "input_type": "search_document"})
+            response = bedrock_client.invoke_model(modelId=model_id, body=body, **_INVOKE_CONSTANT_KWARGS)
+            response_body = orjson.loads(response['body'].read())
+            for emb in response_body.get('embeddings', []):
+                embeddings.append(_l2_normalize(np.asarray(emb, dtype=np.float32)))
+    except Exception as e:
+        print(f"❌ Error getting batch embeddings: {e}")
+
+    # Pad on partial failure so results stay aligned with the input
+    embeddings.extend([None] * (len(texts) - len(embeddings)))
+    return embeddings
+
+# Splitter instances are reusable; constructing one compiles the separator
+# handling, so keep one per (chunk_size, overlap) pair instead of per call
+_splitter_cache = {}
+
+def _get_splitter(chunk_size, overlap):
+    """Return a cached RecursiveCharacterTextSplitter for this configuration"""
+    splitter = _splitter_cache.get((chunk_size, overlap))
+    if splitter is None:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=overlap,
+            length_function=len,
+            separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]  # Priority order for splitting
+        )
+        _splitter_cache[(chunk_size, overlap)] = splitter
+    return splitter
+
 def chunk_text(text, chunk_size, overlap=200):
     """
     Split text into chunks of specified size with overlap using RecursiveCharacterTextSplitter.
@@ -104,19 +287,33 @@ def chunk_text(text, chunk_size, overlap=200):
     """
     if not text or len(text) <= chunk_size:
         return [text] if text else []
-    
-    # Create text splitter with intelligent chunking
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=overlap,
-        length_function=len,
-        separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]  # Priority order for splitting
-    )
-    
-    # Split the text
-    chunks = text_splitter.split_text(text)
-    
-    return chunks
+
+    # Split the text with a cached splitter for this (size, overlap) pair
+    chunks = _get_splitter(chunk_size, overlap).split_text(text)
+
+    # Titan charges per call regardless of length, so fold tiny trailing
+    # chunks (short headings, stray list items) into the previous chunk and
+    # drop whitespace-only ones rather than spending a call on each
+    min_chunk_chars = chunk_size // 4
+    merged = []
+    for chunk in chunks:
+        if not chunk.strip():
+            continue
+        if merged and len(chunk) < min_chunk_chars:
+            merged[-1] = f"{merged[-1]}\n{chunk}"
+        else:
+            merged.append(chunk)
+
+    return merged
+
+def _batch_threshold():
+    """Chunk count above which the Bedrock batch inference job pays off"""
+    return int(os.getenv('BATCH_THRESHOLD', '500'))
+
+def _batch_job_configured():
+    """Whether the S3 and IAM settings for batch inference jobs are present"""
+    return all(os.getenv(name) for name in
+               ('BEDROCK_BATCH_S3_INPUT', 'BEDROCK_BATCH_S3_OUTPUT', 'BEDROCK_BATCH_ROLE_ARN'))
 
 def get_chunk_embeddings(bedrock_client, text, model_id, chunk_size):
     """
@@ -144,99 +341,361 @@ def get_chunk_embeddings(bedrock_client, text, model_id, chunk_size):
         return []
     
     print(f"   📄 Split content into {len(chunks)} chunk(s) (chunk_size: {chunk_size}, overlap: {overlap})")
-    
+
+    # Embed each distinct chunk once - repeated boilerplate otherwise costs
+    # a full Bedrock call per occurrence
+    unique_chunks = list(dict.fromkeys(chunks))
+
+    embedding_by_chunk = {}
+    if len(unique_chunks) > _batch_threshold() and _batch_job_configured():
+        # Very large pages go through the asynchronous batch inference job,
+        # which costs about half as much as per-chunk invoke_model calls
+        print(f"   📦 {len(unique_chunks)} chunks exceed BATCH_THRESHOLD, using batch inference...")
+        results = get_embeddings_batch_async(
+            unique_chunks, model_id,
+            os.getenv('BEDROCK_BATCH_S3_INPUT'),
+            os.getenv('BEDROCK_BATCH_S3_OUTPUT'),
+            os.getenv('BEDROCK_BATCH_ROLE_ARN'),
+            os.getenv('AWS_ACCESS_KEY'),
+            os.getenv('AWS_SECRET_KEY'),
+            os.getenv('AWS_REGION', 'us-east-1')
+        )
+        embedding_by_chunk = dict(zip(unique_chunks, results or []))
+    elif model_id.startswith('cohere.embed'):
+        # Cohere models embed whole batches in a single call
+        results = get_embeddings_batch(bedrock_client, unique_chunks, model_id)
+        embedding_by_chunk = dict(zip(unique_chunks, results))
+    else:
+        # Embed chunks concurrently - each call is a network round-trip to
+        # Bedrock, so overlapping them cuts wall time by roughly the worker
+        # count. EMBED_CONCURRENCY tunes this against the account's RPS quota.
+        max_workers = int(os.getenv('EMBED_CONCURRENCY', '8'))
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_chunks))) as executor:
+            future_to_chunk = {
+                executor.submit(get_embedding, bedrock_client, chunk, model_id): chunk
+                for chunk in unique_chunks
+            }
+            for future in as_completed(future_to_chunk):
+                embedding_by_chunk[future_to_chunk[future]] = future.result()
+
+    embeddings = [embedding_by_chunk.get(chunk) for chunk in chunks]
+
     chunk_embeddings = []
-    for i, chunk in enumerate(chunks, 1):
-        print(f"   🔍 Generating embedding for chunk {i}/{len(chunks)}...")
-        embedding = get_embedding(bedrock_client, chunk, model_id)
-        
-        if embedding:
+    for i, (chunk, embedding) in enumerate(zip(chunks, embeddings), 1):
+        if embedding is not None and len(embedding):
             chunk_embeddings.append((chunk, embedding))
         else:
             print(f"   ⚠️  Failed to generate embedding for chunk {i}")
-    
+
     return chunk_embeddings
 
-def get_all_notion_pages(notion_secret):
+def get_embeddings_batch_async(texts, model_id, s3_input_uri, s3_output_uri, role_arn,
+                               aws_access_key, aws_secret_key, aws_region, poll_interval=60):
+    """
+    Embed a large corpus via a Bedrock asynchronous batch inference job.
+
+    Cheaper (about 50%) and more throughput-friendly than per-text
+    invoke_model calls when embedding thousands of texts. Use the
+    synchronous path for small batches; the job overhead only pays off
+    for large corpora.
+
+    Args:
+        texts (list): Texts to embed
+        model_id (str): Bedrock model ID
+        s3_input_uri (str): S3 URI prefix for the input JSONL (s3://bucket/prefix/)
+        s3_output_uri (str): S3 URI prefix for the job output
+        role_arn (str): IAM role Bedrock assumes to read/write S3
+        aws_access_key (str): AWS access key
+        aws_secret_key (str): AWS secret key
+        aws_region (str): AWS region
+        poll_interval (int): Seconds between job status polls
+
+    Returns:
+        list: Embeddings in the same order as texts, or None on failure
+    """
+    try:
+        import boto3
+
+        session_kwargs = {
+            'region_name': aws_region,
+            'aws_access_key_id': aws_access_key,
+            'aws_secret_access_key': aws_secret_key
+        }
+        s3_client = boto3.client('s3', **session_kwargs)
+        bedrock = boto3.client('bedrock', **session_kwargs)
+
+        # Write one JSONL record per text to the S3 input prefix
+        bucket, _, input_key_prefix = s3_input_uri.replace('s3://', '').partition('/')
+        input_key = f"{input_key_prefix.rstrip('/')}/embeddings_input.jsonl"
+        lines = [
+            orjson.dumps({"recordId": str(i), "modelInput": {"inputText": text}})
+            for i, text in enumerate(texts)
+        ]
+        s3_client.put_object(Bucket=bucket, Key=input_key, Body=b'\n'.join(lines))
+        print(f"📤 Uploaded {len(texts)} record(s) to s3://{bucket}/{input_key}")
+
+        # Submit the batch inference job
+        job_name = f"notion-embeddings-{int(time.time())}"
+        job = bedrock.create_model_invocation_job(
+            jobName=job_name,
+            modelId=model_id,
+            roleArn=role_arn,
+            inputDataConfig={'s3InputDataConfig': {'s3Uri': f"s3://{bucket}/{input_key}"}},
+            outputDataConfig={'s3OutputDataConfig': {'s3Uri': s3_output_uri}}
+        )
+        job_arn = job['jobArn']
+        print(f"🚀 Submitted batch inference job '{job_name}'")
+
+        # Poll until the job finishes
+        while True:
+            status = bedrock.get_model_invocation_job(jobIdentifier=job_arn)['status']
+            if status == 'Completed':
+                break
+            if status in ('Failed', 'Stopped', 'Expired'):
+                print(f"❌ Batch inference job ended with status '{status}'")
+                return None
+            print(f"   ⏳ Batch job status: {status}, polling again in {poll_interval}s...")
+            time.sleep(poll_interval)
+
+        # Collect output JSONL record(s) and restore input order via recordId
+        out_bucket, _, out_prefix = s3_output_uri.replace('s3://', '').partition('/')
+        job_id = job_arn.split('/')[-1]
+        embeddings_by_record = {}
+        paginator = s3_client.get_paginator('list_objects_v2')
+        for result in paginator.paginate(Bucket=out_bucket, Prefix=f"{out_prefix.rstrip('/')}/{job_id}/"):
+            for obj in result.get('Contents', []):
+                if not obj['Key'].endswith('.jsonl.out'):
+                    continue
+                body = s3_client.get_object(Bucket=out_bucket, Key=obj['Key'])['Body'].read()
+                for line in body.splitlines():
+                    if not line.strip():
+                        continue
+                    record = orjson.loads(line)
+                    embedding = record.get('modelOutput', {}).get('embedding')
+                    if embedding:
+                        embeddings_by_record[record['recordId']] = embedding
+
+        embeddings = [embeddings_by_record.get(str(i)) for i in range(len(texts))]
+        print(f"✅ Batch job returned {sum(e is not None for e in embeddings)}/{len(texts)} embedding(s)")
+        return embeddings
+
+    except Exception as e:
+        print(f"❌ Error running batch inference job: {e}")
+        return None
+
+class _TokenBucket:
+    """Token-bucket rate limiter shared by all Notion-calling threads
+
+    Notion's public limit is an average of 3 requests/second; staying under
+    it avoids 429 responses and their retry backoff entirely.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+@functools.lru_cache(maxsize=1)
+def _notion_rate_limiter():
+    """Build the shared token bucket on first use
+
+    Constructed lazily so NOTION_RPS set via .env is seen - load_dotenv()
+    only runs inside load_environment(), after this module is imported.
+    """
+    return _TokenBucket(float(os.getenv('NOTION_RPS', '3')))
+
+@functools.lru_cache(maxsize=1)
+def _notion_client(notion_secret):
+    """Create the Notion client once so all calls share its connection pool"""
+    from notion_client import Client
+
+    return Client(auth=notion_secret)
+
+def iter_pages(notion):
+    """Yield every page from Notion search, following pagination cursors"""
+    has_more = True
+    start_cursor = None
+
+    while has_more:
+        # Prepare search parameters
+        search_params = {
+            "filter": {
+                "property": "object",
+                "value": "page"
+            }
+        }
+
+        # Add cursor for pagination (except for first page)
+        if start_cursor:
+            search_params["start_cursor"] = start_cursor
+
+        _notion_rate_limiter().acquire()
+        response = notion.search(**search_params)
+        yield from response.get('results', [])
+
+        has_more = response.get('has_more', False)
+        start_cursor = response.get('next_cursor')
+
+def iter_blocks(notion, block_id):
+    """Yield every child block of a page/block, following pagination cursors"""
+    start_cursor = None
+
+    while True:
+        _notion_rate_limiter().acquire()
+        if start_cursor:
+            blocks = notion.blocks.children.list(block_id=block_id, start_cursor=start_cursor)
+        else:
+            blocks = notion.blocks.children.list(block_id=block_id)
+
+        yield from blocks.get('results', [])
+
+        if not blocks.get('has_more'):
+            return
+        start_cursor = blocks.get('next_cursor')
+
+def get_all_notion_pages(notion):
     """Retrieve all pages from Notion with pagination support"""
     try:
-        notion = Client(auth=notion_secret)
-        
         print("🔍 Searching for Notion pages...")
-        
-        all_pages = []
-        has_more = True
-        start_cursor = None
-        page_count = 0
-        
-        while has_more:
-            page_count += 1
-            print(f"   📄 Fetching page {page_count}...")
-            
-            # Prepare search parameters
-            search_params = {
-                "filter": {
-                    "property": "object",
-                    "value": "page"
-                }
-            }
-            
-            # Add cursor for pagination (except for first page)
-            if start_cursor:
-                search_params["start_cursor"] = start_cursor
-            
-            # Perform search
-            response = notion.search(**search_params)
-            
-            # Get results from this page
-            pages = response.get('results', [])
-            all_pages.extend(pages)
-            
-            # Check if there are more pages
-            has_more = response.get('has_more', False)
-            start_cursor = response.get('next_cursor')
-            
-            print(f"   📄 Found {len(pages)} pages on page {page_count}")
-        
+
+        all_pages = list(iter_pages(notion))
+
         if not all_pages:
             print("📝 No pages found accessible to this integration")
             return []
-        
-        print(f"📄 Total pages found: {len(all_pages)} across {page_count} API calls")
+
+        print(f"📄 Total pages found: {len(all_pages)}")
         return all_pages
-        
+
     except Exception as e:
         print(f"❌ Error retrieving Notion pages: {e}")
         return []
 
-def get_page_content(notion_secret, page_id):
+def _fetch_child_blocks(notion, block_id):
+    """Fetch all children of a block as a list"""
+    return list(iter_blocks(notion, block_id))
+
+def get_page_content(notion, page_id, max_retries=3):
     """Get detailed content of a specific page"""
-    try:
-        notion = Client(auth=notion_secret)
-        
-        # Get page details
-        page = notion.pages.retrieve(page_id=page_id)
-        
-        # Get page blocks
-        blocks = notion.blocks.children.list(block_id=page_id)
-        all_blocks = blocks.get('results', [])
-        
-        # Handle pagination for blocks
-        while blocks.get('has_more'):
-            blocks = notion.blocks.children.list(
-                block_id=page_id,
-                start_cursor=blocks.get('next_cursor')
-            )
-            all_blocks.extend(blocks.get('results', []))
-        
-        return {
-            'page': page,
-            'blocks': all_blocks
+    for attempt in range(max_retries + 1):
+        try:
+            # Get page details
+            _notion_rate_limiter().acquire()
+            page = notion.pages.retrieve(page_id=page_id)
+
+            # Get page blocks, streaming through pagination
+            all_blocks = list(iter_blocks(notion, page_id))
+
+            # Fetch children of nested blocks (toggles, nested lists, ...)
+            # concurrently and attach them to their parents; child pages and
+            # databases are separate documents and are left alone
+            parents = [
+                block for block in all_blocks
+                if block.get('has_children') and block.get('type') not in ('child_page', 'child_database')
+            ]
+            if parents:
+                with ThreadPoolExecutor(max_workers=min(5, len(parents))) as executor:
+                    future_to_block = {
+                        executor.submit(_fetch_child_blocks, notion, block['id']): block
+                        for block in parents
+                    }
+                    for future in as_completed(future_to_block):
+                        future_to_block[future]['children'] = future.result()
+
+            return {
+                'page': page,
+                'blocks': all_blocks
+            }
+
+        except Exception as e:
+            # Back off and retry when Notion rate-limits us (HTTP 429)
+            status = getattr(e, 'status', None) or getattr(e, 'code', None)
+            if status == 429 and attempt < max_retries:
+                wait_time = 2 ** attempt
+                print(f"   ⏳ Rate limited by Notion, retrying in {wait_time}s...")
+                time.sleep(wait_time)
+                continue
+            print(f"❌ Error retrieving page content: {e}")
+            return None
+
+def iter_page_contents(notion, pages, max_workers=None):
+    """Yield (page, content) pairs as concurrent fetches complete
+
+    Streaming results lets the caller embed and store early pages while
+    later pages are still downloading, so the Notion and Bedrock network
+    pipes overlap instead of running back to back.
+    """
+    if max_workers is None:
+        # Notion's public rate limit averages ~3 req/s; 5 workers stays in
+        # burst range without drawing constant 429s
+        max_workers = int(os.getenv('NOTION_CONCURRENCY', '5'))
+
+    print(f"🔍 Fetching content for {len(pages)} page(s) with {max_workers} worker(s)...")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_page = {
+            executor.submit(get_page_content, notion, page['id']): page
+            for page in pages
         }
-        
-    except Exception as e:
-        print(f"❌ Error retrieving page content: {e}")
-        return None
+        for future in as_completed(future_to_page):
+            yield future_to_page[future], future.result()
+
+# Block types whose text lives in a 'rich_text' array
+_RICH_TEXT_BLOCKS = frozenset({
+    'paragraph', 'heading_1', 'heading_2', 'heading_3',
+    'bulleted_list_item', 'numbered_list_item', 'to_do',
+    'code', 'quote', 'callout'
+})
+
+def _rich_text(rich_text):
+    """Join the plain text of a Notion rich_text array"""
+    return ''.join(part.get('plain_text', '') for part in rich_text)
+
+def _rich_text_handler(block_type):
+    """Build a handler that pulls plain text out of one block type"""
+    def handler(block):
+        return _rich_text(block[block_type].get('rich_text', []))
+    return handler
+
+# O(1) handler dispatch per block; extend with handlers for other block
+# types (tables, media, ...) as they become worth indexing
+_BLOCK_HANDLERS = {block_type: _rich_text_handler(block_type) for block_type in _RICH_TEXT_BLOCKS}
+
+# Property-type extractors, dispatched by 'type' instead of an elif cascade
+_PROP_HANDLERS = {
+    'title': lambda v: _rich_text(v.get('title', [])),
+    'rich_text': lambda v: _rich_text(v.get('rich_text', [])),
+    'number': lambda v: v.get('number'),
+    'select': lambda v: v['select'].get('name') if v.get('select') else None,
+    'multi_select': lambda v: [item.get('name') for item in v.get('multi_select', [])],
+    'date': lambda v: v['date'].get('start') if v.get('date') else None,
+    'checkbox': lambda v: v.get('checkbox'),
+    'url': lambda v: v.get('url'),
+    'email': lambda v: v.get('email'),
+    'phone_number': lambda v: v.get('phone_number'),
+}
+
+def _extract_title(properties):
+    """Extract the page title from already-extracted property values"""
+    for prop_name, prop_value in properties.items():
+        if prop_name.lower() in ('title', 'name'):
+            return str(prop_value) if prop_value else "Untitled"
+    return "Untitled"
 
 def extract_page_data(page_data):
     """Extract relevant data from a page"""
@@ -256,94 +715,61 @@ def extract_page_data(page_data):
         'content_blocks': []
     }
     
-    # Extract property values
+    # Extract property values via O(1) handler dispatch
     for prop_name, prop_value in properties.items():
         prop_type = prop_value.get('type')
-        if prop_type == 'title':
-            title_parts = prop_value.get('title', [])
-            page_info['properties'][prop_name] = ''.join([part.get('plain_text', '') for part in title_parts])
-        elif prop_type == 'rich_text':
-            rich_text_parts = prop_value.get('rich_text', [])
-            page_info['properties'][prop_name] = ''.join([part.get('plain_text', '') for part in rich_text_parts])
-        elif prop_type == 'number':
-            page_info['properties'][prop_name] = prop_value.get('number')
-        elif prop_type == 'select':
-            select_value = prop_value.get('select')
-            page_info['properties'][prop_name] = select_value.get('name') if select_value else None
-        elif prop_type == 'multi_select':
-            multi_select_values = prop_value.get('multi_select', [])
-            page_info['properties'][prop_name] = [item.get('name') for item in multi_select_values]
-        elif prop_type == 'date':
-            date_value = prop_value.get('date')
-            page_info['properties'][prop_name] = date_value.get('start') if date_value else None
-        elif prop_type == 'checkbox':
-            page_info['properties'][prop_name] = prop_value.get('checkbox')
-        elif prop_type == 'url':
-            page_info['properties'][prop_name] = prop_value.get('url')
-        elif prop_type == 'email':
-            page_info['properties'][prop_name] = prop_value.get('email')
-        elif prop_type == 'phone_number':
-            page_info['properties'][prop_name] = prop_value.get('phone_number')
+        handler = _PROP_HANDLERS.get(prop_type)
+        if handler:
+            page_info['properties'][prop_name] = handler(prop_value)
         else:
-            page_info['properties'][prop_name] = str(prop_value)
-    
-    # Extract block content for embedding
-    content_parts = []
-    for block in blocks:
-        block_type = block.get('type')
-        block_data = {
-            'id': block['id'],
-            'type': block_type,
-            'content': ''
-        }
-        
-        if block_type == 'paragraph':
-            rich_text = block[block_type].get('rich_text', [])
-            text_content = ''.join([text.get('plain_text', '') for text in rich_text])
-            block_data['content'] = text_content
-            content_parts.append(text_content)
-        elif block_type in ['heading_1', 'heading_2', 'heading_3']:
-            rich_text = block[block_type].get('rich_text', [])
-            text_content = ''.join([text.get('plain_text', '') for text in rich_text])
-            block_data['content'] = text_content
-            content_parts.append(text_content)
-        elif block_type in ['bulleted_list_item', 'numbered_list_item']:
-            rich_text = block[block_type].get('rich_text', [])
-            text_content = ''.join([text.get('plain_text', '') for text in rich_text])
-            block_data['content'] = text_content
-            content_parts.append(text_content)
-        elif block_type == 'to_do':
-            rich_text = block[block_type].get('rich_text', [])
-            text_content = ''.join([text.get('plain_text', '') for text in rich_text])
-            block_data['content'] = text_content
-            content_parts.append(text_content)
-        elif block_type == 'code':
-            rich_text = block[block_type].get('rich_text', [])
-            text_content = ''.join([text.get('plain_text', '') for text in rich_text])
-            block_data['content'] = text_content
-            content_parts.append(text_content)
-        elif block_type == 'quote':
-            rich_text = block[block_type].get('rich_text', [])
-            text_content = ''.join([text.get('plain_text', '') for text in rich_text])
-            block_data['content'] = text_content
-            content_parts.append(text_content)
-        elif block_type == 'callout':
-            rich_text = block[block_type].get('rich_text', [])
-            text_content = ''.join([text.get('plain_text', '') for text in rich_text])
-            block_data['content'] = text_content
-            content_parts.append(text_content)
-        
-        page_info['content_blocks'].append(block_data)
+            # Keep only the type marker for unsupported property types instead
+            # of the full stringified payload, which bloats stored documents
+            page_info['properties'][prop_name] = {'type': prop_type}
     
+    # Extract block content for embedding, descending into fetched children.
+    # Writing into one buffer avoids holding both a list of every block's
+    # text and the joined copy in memory at once.
+    content_buf = io.StringIO()
+
+    def collect_blocks(block_list):
+        for block in block_list:
+            block_type = block.get('type')
+            block_data = {
+                'id': block['id'],
+                'type': block_type,
+                'content': ''
+            }
+
+            handler = _BLOCK_HANDLERS.get(block_type)
+            if handler:
+                block_data['content'] = handler(block)
+
+            # Blocks with no extractable content add bytes but no signal
+            if block_data['content']:
+                page_info['content_blocks'].append(block_data)
+                content_buf.write(block_data['content'])
+                content_buf.write(' ')
+
+            children = block.get('children')
+            if children:
+                collect_blocks(children)
+
+    collect_blocks(blocks)
+
     # Combine all text content for embedding
-    page_info['content_text'] = ' '.join(content_parts)
-    
+    page_info['content_text'] = content_buf.getvalue().rstrip()
+
+    # Compute the title once so insert/update paths don't rescan properties
+    page_info['page_title'] = _extract_title(page_info['properties'])
+
     return page_info
 
 def create_astra_client(astra_db_endpoint, astra_db_keyspace, astra_db_application_token, 
                        astra_db_name, vector_collection_name):
     """Create Astra DB client using Astrapy"""
     try:
+        from astrapy.db import AstraDB
+
         # Create Astra DB client
         db = AstraDB(
             token=astra_db_application_token,
@@ -366,45 +792,127 @@ def create_astra_client(astra_db_endpoint, astra_db_keyspace, astra_db_applicati
 def create_vector_collection(db, collection_name):
     """Create vector collection in Astra DB"""
     try:
-        # First, try to get the collection to see if it exists
-        try:
-            collection = db.collection(collection_name)
-            # Test if collection exists by trying to access it
-            collection.find_one()
+        # Check existence against the collection listing rather than probing
+        # with a find_one(), which scans the collection
+        existing = db.get_collections()
+        names = {c.get('name') if isinstance(c, dict) else c
+                 for c in existing.get('status', {}).get('collections', [])}
+
+        if collection_name in names:
             print(f"✅ Vector collection '{collection_name}' already exists")
-            return collection
-        except Exception:
-            # Collection doesn't exist, create it
-            print(f"📝 Creating new vector collection '{collection_name}'...")
-            collection = db.create_collection(
-                collection_name,
-                dimension=1024,  # Amazon Titan embedding dimension
-                metric="cosine"
-            )
-            print(f"✅ Vector collection '{collection_name}' created successfully")
-            return collection
-        
+            return db.collection(collection_name)
+
+        # Collection doesn't exist, create it
+        print(f"📝 Creating new vector collection '{collection_name}'...")
+        collection = db.create_collection(
+            collection_name,
+            dimension=int(os.getenv('EMBED_DIMENSIONS', '1024')),  # Titan embedding dimension
+            metric="cosine"
+        )
+        print(f"✅ Vector collection '{collection_name}' created successfully")
+        return collection
+
     except Exception as e:
         print(f"❌ Error with vector collection: {e}")
         return None
 
-def check_page_exists(db, collection_name, page_id):
+def create_pages_collection(db, collection_name):
+    """Create the sibling collection holding one metadata document per page"""
+    pages_name = f"{collection_name}_pages"
+    try:
+        existing = db.get_collections()
+        names = {c.get('name') if isinstance(c, dict) else c
+                 for c in existing.get('status', {}).get('collections', [])}
+
+        if pages_name in names:
+            return db.collection(pages_name)
+
+        print(f"📝 Creating page metadata collection '{pages_name}'...")
+        return db.create_collection(pages_name)
+
+    except Exception as e:
+        print(f"❌ Error with page metadata collection: {e}")
+        return None
+
+def _upsert_page_metadata(pages_collection, page_data, model_id):
+    """Store page-level metadata once per page instead of once per chunk"""
+    if pages_collection is None:
+        return
+    page_title = page_data.get('page_title') or "Untitled"
+    document = {
+        "page_id": page_data['id'],
+        "page_title": page_title,
+        "page_url": page_data['url'],
+        "created_time": page_data['created_time'],
+        "last_edited_time": page_data['last_edited_time'],
+        "archived": page_data['archived'],
+        "properties": page_data['properties'],
+        "content_text": page_data['content_text'],
+        **({"content_blocks": page_data['content_blocks']} if _store_blocks() else {}),
+        "embedding_model": model_id,
+        "last_updated_time": datetime.now().isoformat()
+    }
+    try:
+        pages_collection.find_one_and_replace(
+            filter={"page_id": page_data['id']},
+            replacement=document,
+            options={"upsert": True}
+        )
+    except Exception as e:
+        print(f"⚠️  Failed to store page metadata: {e}")
+
+def check_page_exists(collection, page_id):
     """Check if a page already exists in the collection and return its data"""
     try:
-        # Find all chunks for this page
-        result = db.collection(collection_name).find({"page_id": page_id})
-        chunks = list(result)
-        
-        if chunks:
-            # Return the first chunk as representative of the page
-            # All chunks should have the same page metadata
-            return chunks[0]
-        else:
-            return None
+        # One chunk is representative of the page - all chunks carry the
+        # same page metadata, so don't pull the whole chunk set. Project
+        # down to the freshness fields so the $vector never crosses the wire
+        result = collection.find_one(
+            {"page_id": page_id},
+            projection={"page_id": 1, "last_updated_time": 1}
+        )
+
+        if isinstance(result, dict) and 'data' in result:
+            return result['data'].get('document')
+        return result or None
     except Exception as e:
         print(f"❌ Error checking if page exists: {e}")
         return None
 
+# Astra's Data API caps $in lists; stay comfortably under it
+_EXISTS_QUERY_BATCH = 100
+
+def fetch_existing_pages(collection, page_ids):
+    """Fetch existing page metadata for many page_ids in bulk
+
+    Returns a dict mapping page_id to one representative document with just
+    the fields change detection needs, replacing a find_one round-trip per
+    page with one query per hundred pages.
+    """
+    existing_by_id = {}
+    try:
+        for start in range(0, len(page_ids), _EXISTS_QUERY_BATCH):
+            batch = page_ids[start:start + _EXISTS_QUERY_BATCH]
+            page_state = None
+            while True:
+                options = {"pageState": page_state} if page_state else None
+                result = collection.find(
+                    filter={"page_id": {"$in": batch}},
+                    projection={"page_id": 1, "last_updated_time": 1},
+                    options=options
+                )
+                data = result.get('data', {}) if isinstance(result, dict) else {}
+                for doc in data.get('documents', []):
+                    # All chunks of a page carry the same metadata; keep one
+                    existing_by_id.setdefault(doc.get('page_id'), doc)
+                page_state = data.get('nextPageState')
+                if not page_state:
+                    break
+    except Exception as e:
+        print(f"⚠️  Bulk existence check failed, falling back to per-page lookups: {e}")
+        return None
+    return existing_by_id
+
 def should_update_page(existing_page, page_data):
     """Check if page needs updating based on last modified time"""
     if not existing_page:
@@ -444,16 +952,20 @@ def should_update_page(existing_page, page_data):
     # Update if current page is newer
     return current_edited_time > existing_updated_time
 
-def update_page_embedding(db, collection_name, page_data, embedding, model_id):
+def _store_blocks():
+    """Whether to persist the raw content_blocks array in Astra documents
+
+    Off by default: the blocks duplicate content_text as rich JSON and can
+    inflate each document 2-10x, slowing every insert.
+    """
+    return os.getenv('STORE_BLOCKS', '0') == '1'
+
+def update_page_embedding(collection, page_data, embedding, model_id):
     """Update an existing page with new data and embedding"""
     try:
-        # Extract title from properties
-        page_title = "Untitled"
-        if 'properties' in page_data:
-            for prop_name, prop_value in page_data['properties'].items():
-                if prop_name.lower() in ['title', 'name']:
-                    page_title = str(prop_value) if prop_value else "Untitled"
-                    break
+        # Title is computed once in extract_page_data
+        page_title = page_data.get('page_title') or "Untitled"
+        now_iso = datetime.now().isoformat()
         
         # Prepare document for update
         document = {
@@ -465,15 +977,16 @@ def update_page_embedding(db, collection_name, page_data, embedding, model_id):
             "archived": page_data['archived'],
             "properties": page_data['properties'],
             "content_text": page_data['content_text'],
-            "content_blocks": page_data['content_blocks'],
+            **({"content_blocks": page_data['content_blocks']} if _store_blocks() else {}),
             "embedding_model": model_id,
-            "updated_at": datetime.now().isoformat(),
-            "last_updated_time": datetime.now().isoformat(),  # Track when we last updated
-            "$vector": embedding
+            "updated_at": now_iso,
+            "last_updated_time": now_iso,  # Track when we last updated
+            # Astra expects a plain float list for $vector
+            "$vector": np.asarray(embedding, dtype=np.float32).tolist()
         }
         
         # Update document in collection
-        result = db.collection(collection_name).update_one(
+        result = collection.update_one(
             {"page_id": page_data['id']},
             {"$set": document}
         )
@@ -484,19 +997,68 @@ def update_page_embedding(db, collection_name, page_data, embedding, model_id):
         print(f"❌ Error updating page embedding: {e}")
         return False
 
-def update_page_chunks(db, collection_name, page_data, chunk_embeddings, model_id):
+# Astra's Data API accepts up to 20 documents per insert_many request
+_INSERT_BATCH_SIZE = 20
+
+def _count_inserted(result):
+    """Best-effort count of inserted documents from an Astra DB response"""
+    if isinstance(result, dict):
+        status = result.get('status', result)
+        inserted_ids = status.get('insertedIds')
+        if inserted_ids is not None:
+            return len(inserted_ids)
+    return 0
+
+def _with_retries(operation, description, max_attempts=5):
+    """Call operation(), retrying transient failures with exponential backoff
+
+    Astra returns 429/503 under load; retrying with jittered backoff keeps
+    throughput near the ceiling instead of dropping the write. The Bedrock
+    client gets the same treatment from botocore's adaptive retry mode.
+    """
+    for attempt in range(max_attempts):
+        try:
+            return operation()
+        except Exception as e:
+            if attempt == max_attempts - 1:
+                raise
+            wait = min(60, 2 ** attempt + random.uniform(0, 1))
+            print(f"   ⚠️  {description} failed ({e}), retrying in {wait:.1f}s...")
+            time.sleep(wait)
+
+def _insert_documents(collection, documents):
+    """Insert documents in insert_many batches, returning the inserted count"""
+    batches = [documents[start:start + _INSERT_BATCH_SIZE]
+               for start in range(0, len(documents), _INSERT_BATCH_SIZE)]
+
+    def insert_batch(batch):
+        result = _with_retries(
+            lambda: collection.insert_many(batch, options={"ordered": False}),
+            "insert_many"
+        )
+        counted = _count_inserted(result)
+        # If the response format is unrecognized but present, assume success
+        return counted if counted else (len(batch) if result else 0)
+
+    if len(batches) == 1:
+        return insert_batch(batches[0])
+
+    # Multi-batch pages overlap their insert_many round-trips; unordered
+    # inserts make the batches independent, so order doesn't matter
+    with ThreadPoolExecutor(max_workers=min(4, len(batches))) as executor:
+        return sum(executor.map(insert_batch, batches))
+
+def update_page_chunks(collection, pages_collection, page_data, chunk_embeddings, model_id):
     """Update an existing page with new chunked data and embeddings"""
     try:
-        # Extract title from properties
-        page_title = "Untitled"
-        if 'properties' in page_data:
-            for prop_name, prop_value in page_data['properties'].items():
-                if prop_name.lower() in ['title', 'name']:
-                    page_title = str(prop_value) if prop_value else "Untitled"
-                    break
+        # Title is computed once in extract_page_data
+        page_title = page_data.get('page_title') or "Untitled"
         
         # First, delete all existing chunks for this page
-        delete_result = db.collection(collection_name).delete_many({"page_id": page_data['id']})
+        delete_result = _with_retries(
+            lambda: collection.delete_many({"page_id": page_data['id']}),
+            "delete_many"
+        )
         
         # Handle different possible return formats from Astra DB
         deleted_count = 0
@@ -508,41 +1070,42 @@ def update_page_chunks(db, collection_name, page_data, chunk_embeddings, model_i
             deleted_count = delete_result['deleted_count']
         
         print(f"   🗑️  Deleted {deleted_count} existing chunk(s)")
-        
-        # Insert new chunks
-        inserted_count = 0
+
+        # Page-level metadata lives once in the sibling pages collection,
+        # keeping each chunk document small
+        _upsert_page_metadata(pages_collection, page_data, model_id)
+
+        # Fields shared by every chunk are built once; the loop only adds
+        # the per-chunk values on top
+        page_id = page_data['id']
+        base_doc = {
+            "page_id": page_id,
+            "page_title": page_title,
+            # The search result listing links straight from the chunk doc,
+            # so keep the URL here despite the per-chunk duplication
+            "page_url": page_data['url'],
+            "embedding_model": model_id
+        }
+
+        # One timestamp per page; every chunk shares it
+        now_iso = datetime.now().isoformat()
+
+        # Build all chunk documents, then insert them in batches
+        documents = []
         for i, (chunk_text, embedding) in enumerate(chunk_embeddings, 1):
-            # Prepare document for each chunk
-            document = {
-                "page_id": page_data['id'],
-                "chunk_id": f"{page_data['id']}_chunk_{i}",
+            documents.append({
+                **base_doc,
+                "chunk_id": f"{page_id}_chunk_{i}",
                 "chunk_index": i,
-                "page_title": page_title,
-                "page_url": page_data['url'],
-                "created_time": page_data['created_time'],
-                "last_edited_time": page_data['last_edited_time'],
-                "archived": page_data['archived'],
-                "properties": page_data['properties'],
-                "content_text": page_data['content_text'],  # Full content for reference
                 "chunk_text": chunk_text,  # This chunk's text
-                "content_blocks": page_data['content_blocks'],
-                "embedding_model": model_id,
-                "updated_at": datetime.now().isoformat(),
-                "last_updated_time": datetime.now().isoformat(),
-                "$vector": embedding
-            }
-            
-            # Insert chunk document
-            result = db.collection(collection_name).insert_one(document)
-            
-            # Handle different possible return formats from Astra DB
-            if hasattr(result, 'inserted_id') and result.inserted_id:
-                inserted_count += 1
-            elif isinstance(result, dict) and ('insertedId' in result or 'inserted_id' in result):
-                inserted_count += 1
-            elif result:  # If result exists but we can't determine the format, assume success
-                inserted_count += 1
-        
+                "updated_at": now_iso,
+                "last_updated_time": now_iso,
+                # Astra expects a plain float list for $vector
+                "$vector": np.asarray(embedding, dtype=np.float32).tolist()
+            })
+
+        inserted_count = _insert_documents(collection, documents)
+
         print(f"   💾 Inserted {inserted_count} new chunk(s)")
         return inserted_count > 0
         
@@ -550,51 +1113,47 @@ def update_page_chunks(db, collection_name, page_data, chunk_embeddings, model_i
         print(f"❌ Error updating page chunks: {e}")
         return False
 
-def insert_page_chunks(db, collection_name, page_data, chunk_embeddings, model_id):
+def insert_page_chunks(collection, pages_collection, page_data, chunk_embeddings, model_id):
     """Insert a page with its chunked embeddings into Astra DB"""
     try:
-        # Extract title from properties
-        page_title = "Untitled"
-        if 'properties' in page_data:
-            for prop_name, prop_value in page_data['properties'].items():
-                if prop_name.lower() in ['title', 'name']:
-                    page_title = str(prop_value) if prop_value else "Untitled"
-                    break
-        
-        # Insert all chunks
-        inserted_count = 0
+        # Title is computed once in extract_page_data
+        page_title = page_data.get('page_title') or "Untitled"
+
+        # Page-level metadata lives once in the sibling pages collection,
+        # keeping each chunk document small
+        _upsert_page_metadata(pages_collection, page_data, model_id)
+
+        # Fields shared by every chunk are built once; the loop only adds
+        # the per-chunk values on top
+        page_id = page_data['id']
+        base_doc = {
+            "page_id": page_id,
+            "page_title": page_title,
+            # The search result listing links straight from the chunk doc,
+            # so keep the URL here despite the per-chunk duplication
+            "page_url": page_data['url'],
+            "embedding_model": model_id
+        }
+
+        # One timestamp per page; every chunk shares it
+        now_iso = datetime.now().isoformat()
+
+        # Build all chunk documents, then insert them in batches
+        documents = []
         for i, (chunk_text, embedding) in enumerate(chunk_embeddings, 1):
-            # Prepare document for each chunk
-            document = {
-                "page_id": page_data['id'],
-                "chunk_id": f"{page_data['id']}_chunk_{i}",
+            documents.append({
+                **base_doc,
+                "chunk_id": f"{page_id}_chunk_{i}",
                 "chunk_index": i,
-                "page_title": page_title,
-                "page_url": page_data['url'],
-                "created_time": page_data['created_time'],
-                "last_edited_time": page_data['last_edited_time'],
-                "archived": page_data['archived'],
-                "properties": page_data['properties'],
-                "content_text": page_data['content_text'],  # Full content for reference
                 "chunk_text": chunk_text,  # This chunk's text
-                "content_blocks": page_data['content_blocks'],
-                "embedding_model": model_id,
-                "created_at": datetime.now().isoformat(),
-                "last_updated_time": datetime.now().isoformat(),
-                "$vector": embedding
-            }
-            
-            # Insert chunk document
-            result = db.collection(collection_name).insert_one(document)
-            
-            # Handle different possible return formats from Astra DB
-            if hasattr(result, 'inserted_id') and result.inserted_id:
-                inserted_count += 1
-            elif isinstance(result, dict) and ('insertedId' in result or 'inserted_id' in result):
-                inserted_count += 1
-            elif result:  # If result exists but we can't determine the format, assume success
-                inserted_count += 1
-        
+                "created_at": now_iso,
+                "last_updated_time": now_iso,
+                # Astra expects a plain float list for $vector
+                "$vector": np.asarray(embedding, dtype=np.float32).tolist()
+            })
+
+        inserted_count = _insert_documents(collection, documents)
+
         print(f"   💾 Inserted {inserted_count} chunk(s)")
         return inserted_count > 0
         
@@ -602,16 +1161,12 @@ def insert_page_chunks(db, collection_name, page_data, chunk_embeddings, model_i
         print(f"❌ Error inserting page chunks: {e}")
         return False
 
-def insert_page_embedding(db, collection_name, page_data, embedding, model_id):
-    """Insert a page with its embedding into Astra DB"""
+def insert_page_embedding(collection, page_data, embedding, model_id):
+    """Upsert a page with its embedding into Astra DB, keyed on page_id"""
     try:
-        # Extract title from properties
-        page_title = "Untitled"
-        if 'properties' in page_data:
-            for prop_name, prop_value in page_data['properties'].items():
-                if prop_name.lower() in ['title', 'name']:
-                    page_title = str(prop_value) if prop_value else "Untitled"
-                    break
+        # Title is computed once in extract_page_data
+        page_title = page_data.get('page_title') or "Untitled"
+        now_iso = datetime.now().isoformat()
         
         # Prepare document for insertion
         document = {
@@ -623,75 +1178,148 @@ def insert_page_embedding(db, collection_name, page_data, embedding, model_id):
             "archived": page_data['archived'],
             "properties": page_data['properties'],
             "content_text": page_data['content_text'],
-            "content_blocks": page_data['content_blocks'],
+            **({"content_blocks": page_data['content_blocks']} if _store_blocks() else {}),
             "embedding_model": model_id,
-            "created_at": datetime.now().isoformat(),
-            "last_updated_time": datetime.now().isoformat(),  # Track when we last updated
-            "$vector": embedding
+            "created_at": now_iso,
+            "last_updated_time": now_iso,  # Track when we last updated
+            # Astra expects a plain float list for $vector
+            "$vector": np.asarray(embedding, dtype=np.float32).tolist()
         }
         
-        # Insert document into collection
-        result = db.collection(collection_name).insert_one(document)
-        
+        # Upsert so re-runs replace the existing document instead of
+        # inserting a duplicate, without a separate existence lookup
+        result = collection.find_one_and_replace(
+            filter={"page_id": page_data['id']},
+            replacement=document,
+            options={"upsert": True}
+        )
+
         return True
-        
+
     except Exception as e:
         print(f"❌ Error inserting page embedding: {e}")
         return False
 
+# Bounded hand-off between the embed stage and the Astra writer so a slow
+# insert backlog applies backpressure instead of growing without limit
+_WRITE_QUEUE_SIZE = 32
+
+def _astra_writer(collection, pages_collection, model_id, jobs, counts):
+    """Drain write jobs from the queue until the None sentinel arrives
+
+    Each job is (index, total, is_update, page_data, chunk_embeddings). Runs in
+    a dedicated thread so Astra inserts overlap with embedding the next page.
+    """
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        i, total_pages, is_update, page_data, chunk_embeddings = job
+        if is_update:
+            print(f"   🔄 Page changed, updating chunks...")
+            if update_page_chunks(collection, pages_collection, page_data, chunk_embeddings, model_id):
+                counts['updated'] += 1
+                print(f"   ✅ Successfully updated page {i}/{total_pages}")
+            else:
+                print(f"   ❌ Failed to update page {i}/{total_pages}")
+        else:
+            print(f"   💾 Storing new page chunks in vector database...")
+            if insert_page_chunks(collection, pages_collection, page_data, chunk_embeddings, model_id):
+                counts['inserted'] += 1
+                print(f"   ✅ Successfully stored page {i}/{total_pages}")
+            else:
+                print(f"   ❌ Failed to store page {i}/{total_pages}")
+
 def process_notion_to_vector_db():
     """Main function to process Notion data and store in vector database"""
     print("🚀 Notion to Vector Database Pipeline")
     print("=" * 50)
     
     # Load environment variables
-    (notion_secret, notion_connection, aws_access_key, aws_secret_key, 
-     aws_region, bedrock_model_id, astra_db_endpoint, astra_db_keyspace, 
-     astra_db_application_token, astra_db_name, vector_collection_name, chunk_size) = load_environment()
-    
-    if not all([notion_secret, aws_access_key, aws_secret_key, astra_db_endpoint, 
-                astra_db_keyspace, astra_db_application_token]):
+    cfg = load_environment()
+    if cfg is None:
         sys.exit(1)
-    
+
+    bedrock_model_id = cfg.bedrock_model_id
+    vector_collection_name = cfg.vector_collection_name
+    chunk_size = cfg.chunk_size
+
     # Create Bedrock client
-    bedrock_client = create_bedrock_client(aws_access_key, aws_secret_key, aws_region)
+    bedrock_client = create_bedrock_client(cfg.aws_access_key, cfg.aws_secret_key, cfg.aws_region)
     if not bedrock_client:
         sys.exit(1)
-    
+
     # Create Astra DB client
-    db = create_astra_client(astra_db_endpoint, astra_db_keyspace, 
-                           astra_db_application_token, astra_db_name, vector_collection_name)
+    db = create_astra_client(cfg.astra_db_endpoint, cfg.astra_db_keyspace,
+                           cfg.astra_db_application_token, cfg.astra_db_name, vector_collection_name)
     if not db:
         sys.exit(1)
-    
+
     # Create vector collection
     collection = create_vector_collection(db, vector_collection_name)
     if not collection:
         print("❌ Failed to create or access vector collection")
         sys.exit(1)
-    
+
+    # Sibling collection for one metadata document per page
+    pages_collection = create_pages_collection(db, vector_collection_name)
+
+    # One Notion client serves the search, fetch, and any retry traffic so
+    # every call shares the same keep-alive connection pool
+    notion = _notion_client(cfg.notion_secret)
+
     # Get all Notion pages
-    pages = get_all_notion_pages(notion_secret)
+    pages = get_all_notion_pages(notion)
     if not pages:
         print("❌ No pages found to process")
         sys.exit(1)
-    
-    # Process each page
-    successful_inserts = 0
-    updated_pages = 0
+
+    # Process each page through three overlapped stages: iter_page_contents
+    # fetches ahead with its worker pool, this loop embeds, and a dedicated
+    # writer thread drains inserts/updates from a bounded queue
     skipped_pages = 0
     unchanged_pages = 0
+    failed_embeddings = 0
     total_pages = len(pages)
-    
-    for i, page in enumerate(pages, 1):
+
+    # One bulk query replaces a find_one per page for change detection
+    existing_by_id = fetch_existing_pages(collection, [p['id'] for p in pages])
+
+    # Decide freshness before fetching any blocks - the search result already
+    # carries last_edited_time, so unchanged pages skip their block fetches
+    if existing_by_id is not None:
+        stale_pages = []
+        for page in pages:
+            existing = existing_by_id.get(page['id'])
+            if existing is not None and not should_update_page(existing, page):
+                unchanged_pages += 1
+            else:
+                stale_pages.append(page)
+        if unchanged_pages:
+            print(f"⏭️  Skipping {unchanged_pages} unchanged page(s) without fetching their content")
+    else:
+        stale_pages = pages
+
+    write_jobs = queue.Queue(maxsize=_WRITE_QUEUE_SIZE)
+    write_counts = {'inserted': 0, 'updated': 0}
+    writer = threading.Thread(
+        target=_astra_writer,
+        args=(collection, pages_collection, bedrock_model_id, write_jobs, write_counts),
+        daemon=True
+    )
+    writer.start()
+
+    stale_total = len(stale_pages)
+    for i, (page, page_content) in enumerate(iter_page_contents(notion, stale_pages), 1):
         page_id = page['id']
-        print(f"\n📄 Processing page {i}/{total_pages}: {page_id}")
-        
+        print(f"\n📄 Processing page {i}/{stale_total}: {page_id}")
+
         # Check if page already exists and get its data
-        existing_page = check_page_exists(db, vector_collection_name, page_id)
-        
-        # Get detailed page content
-        page_content = get_page_content(notion_secret, page_id)
+        if existing_by_id is not None:
+            existing_page = existing_by_id.get(page_id)
+        else:
+            existing_page = check_page_exists(collection, page_id)
+
         if not page_content:
             print(f"   ⚠️  Failed to get content for page {page_id}")
             continue
@@ -702,61 +1330,57 @@ def process_notion_to_vector_db():
         # Check if page needs updating
         needs_update = should_update_page(existing_page, page_data)
         
-        # Debug: Show what's happening
-        if existing_page is not None:
-            # Handle different data structures that might be returned
-            existing_time = 'None'
-            try:
-                if isinstance(existing_page, dict):
-                    if 'data' in existing_page and isinstance(existing_page['data'], dict) and 'document' in existing_page['data']:
-                        # Old format
-                        existing_doc = existing_page['data']['document']
-                        existing_time = existing_doc.get('last_updated_time', 'None')
-                    elif 'last_updated_time' in existing_page:
-                        # New chunked format
-                        existing_time = existing_page.get('last_updated_time', 'None')
+        # Per-page timestamp details are debug-level so the hot loop doesn't
+        # block on terminal flushes unless explicitly requested
+        if logger.isEnabledFor(logging.DEBUG):
+            if existing_page is not None:
+                # Handle different data structures that might be returned
+                existing_time = 'None'
+                try:
+                    if isinstance(existing_page, dict):
+                        if 'data' in existing_page and isinstance(existing_page['data'], dict) and 'document' in existing_page['data']:
+                            # Old format
+                            existing_doc = existing_page['data']['document']
+                            existing_time = existing_doc.get('last_updated_time', 'None')
+                        elif 'last_updated_time' in existing_page:
+                            # New chunked format
+                            existing_time = existing_page.get('last_updated_time', 'None')
+                        else:
+                            existing_time = 'Unknown format'
                     else:
-                        existing_time = 'Unknown format'
-                else:
-                    existing_time = 'Non-dict format'
-            except Exception as e:
-                existing_time = f'Error: {e}'
-            
-            current_time = page_data.get('last_edited_time', 'None')
-            print(f"      📅 Existing: {existing_time}")
-            print(f"      📅 Current: {current_time}")
-            print(f"      🔍 Needs update: {needs_update}")
-        else:
-            print(f"      📅 New page, will insert")
+                        existing_time = 'Non-dict format'
+                except Exception as e:
+                    existing_time = f'Error: {e}'
+
+                current_time = page_data.get('last_edited_time', 'None')
+                logger.debug("Existing: %s, Current: %s, Needs update: %s",
+                             existing_time, current_time, needs_update)
+            else:
+                logger.debug("New page, will insert")
         
         if needs_update and page_data['content_text'].strip():
             print(f"   🔍 Generating embeddings for content...")
             chunk_embeddings = get_chunk_embeddings(bedrock_client, page_data['content_text'], bedrock_model_id, chunk_size)
             
             if chunk_embeddings:
-                if existing_page is not None:
-                    print(f"   🔄 Page changed, updating chunks...")
-                    if update_page_chunks(db, vector_collection_name, page_data, chunk_embeddings, bedrock_model_id):
-                        updated_pages += 1
-                        print(f"   ✅ Successfully updated page {i}/{total_pages}")
-                    else:
-                        print(f"   ❌ Failed to update page {i}/{total_pages}")
-                else:
-                    print(f"   💾 Storing new page chunks in vector database...")
-                    if insert_page_chunks(db, vector_collection_name, page_data, chunk_embeddings, bedrock_model_id):
-                        successful_inserts += 1
-                        print(f"   ✅ Successfully stored page {i}/{total_pages}")
-                    else:
-                        print(f"   ❌ Failed to store page {i}/{total_pages}")
+                write_jobs.put((i, stale_total, existing_page is not None, page_data, chunk_embeddings))
             else:
-                print(f"   ⚠️  Failed to generate embeddings for page {i}/{total_pages}")
+                print(f"   ⚠️  Failed to generate embeddings for page {i}/{stale_total}")
+                failed_embeddings += 1
         elif not needs_update:
             print(f"   ⏭️  Page unchanged, skipping...")
             unchanged_pages += 1
         else:
-            print(f"   ⚠️  No content to embed for page {i}/{total_pages}")
+            print(f"   ⚠️  No content to embed for page {i}/{stale_total}")
             skipped_pages += 1
-    
+
+    # Signal the writer that no more pages are coming and wait for the
+    # remaining queued inserts to land
+    write_jobs.put(None)
+    writer.join()
+    successful_inserts = write_counts['inserted']
+    updated_pages = write_counts['updated']
+
     # Summary
     print(f"\n🎉 Processing completed!")
     print(f"📊 Summary:")
@@ -765,12 +1389,14 @@ def process_notion_to_vector_db():
     print(f"   - Existing pages updated: {updated_pages}")
     print(f"   - Pages unchanged (skipped): {unchanged_pages}")
     print(f"   - Pages skipped (no content): {skipped_pages}")
+    print(f"   - Failed embeddings: {failed_embeddings}")
     print(f"   - Failed: {total_pages - successful_inserts - updated_pages - unchanged_pages - skipped_pages}")
     
     return successful_inserts + updated_pages
 
 def main():
     """Main function"""
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'))
     process_notion_to_vector_db()
 
 if __name__ == "__main__":
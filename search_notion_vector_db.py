@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Interactive similarity search over the Notion embeddings stored in Astra DB
+"""
+
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+
+import numpy as np
+import orjson
+
+from notion_to_vector_db import (
+    load_environment,
+    create_bedrock_client,
+    create_astra_client,
+    create_vector_collection,
+    get_embedding,
+)
+
+# LRU cache of query embeddings - repeated or paged searches in one session
+# skip the Bedrock round-trip entirely
+_QUERY_CACHE_MAX_SIZE = 512
+_query_cache = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+def cached_get_embedding(bedrock_client, query, model_id):
+    """Return the query embedding, serving repeats from an in-process LRU"""
+    key = (model_id, query)
+    with _query_cache_lock:
+        embedding = _query_cache.get(key)
+        if embedding is not None:
+            _query_cache.move_to_end(key)
+            return embedding
+
+    # Interactive queries are latency-sensitive, so ask for the optimized path
+    embedding = get_embedding(bedrock_client, query, model_id, latency='optimized')
+
+    if embedding is not None and embedding.size:
+        with _query_cache_lock:
+            _query_cache[key] = embedding
+            if len(_query_cache) > _QUERY_CACHE_MAX_SIZE:
+                _query_cache.popitem(last=False)
+
+    return embedding
+
+class SemanticCache:
+    """Similarity cache mapping recent query embeddings to their results
+
+    Rephrasings of the same question embed close together, so a new query
+    whose cosine similarity to a cached one exceeds the threshold reuses
+    the cached results without touching Bedrock's output or Astra at all.
+    """
+
+    def __init__(self, capacity=256, threshold=None):
+        self.capacity = capacity
+        if threshold is None:
+            threshold = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.93'))
+        self.threshold = threshold
+        self.vectors = None  # (N, dim) float32, rows L2-normalized
+        self.results = []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding):
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def get(self, query_embedding):
+        """Return cached results for a near-identical query, or None"""
+        q = self._normalize(query_embedding)
+        with self.lock:
+            if self.vectors is None or not len(self.results):
+                return None
+            # One matmul scores every cached query at once
+            sims = self.vectors @ q
+            best = int(np.argmax(sims))
+            if sims[best] >= self.threshold:
+                return self.results[best]
+        return None
+
+    def put(self, query_embedding, results):
+        """Cache the results for this query, evicting the oldest entry when full"""
+        q = self._normalize(query_embedding)
+        with self.lock:
+            if self.vectors is None:
+                self.vectors = q[np.newaxis, :]
+            else:
+                self.vectors = np.vstack([self.vectors, q])
+            self.results.append(results)
+            if len(self.results) > self.capacity:
+                self.vectors = self.vectors[1:]
+                self.results.pop(0)
+
+_semantic_cache = SemanticCache()
+
+class LocalVectorIndex:
+    """In-process mirror of the chunk collection for local similarity search
+
+    For small-to-medium workspaces the whole collection fits comfortably in
+    memory, and a NumPy dot product over every vector answers a query in
+    single-digit milliseconds versus an HTTPS round-trip to Astra. Enabled
+    with USE_LOCAL_INDEX=1.
+    """
+
+    def __init__(self):
+        self.matrix = None  # (N, dim) float32, rows L2-normalized
+        self.docs = []
+        # LOCAL_INDEX_INT8=1 stores the matrix int8-quantized: 4x fewer
+        # bytes moved per query at a tiny ranking precision cost
+        self.quantized = os.getenv('LOCAL_INDEX_INT8', '0') == '1'
+        self.scales = None  # (N,) float32 per-row dequantization scales
+
+    def build(self, collection):
+        """Mirror all chunk vectors and display fields from Astra
+
+        Returns True when the index is usable, False otherwise.
+        """
+        try:
+            print("⏳ Building local vector index...")
+            docs = []
+            page_state = None
+            while True:
+                options = {"pageState": page_state} if page_state else None
+                result = collection.find(
+                    filter={},
+                    projection={"page_id": 1, "page_title": 1, "page_url": 1,
+                                "chunk_text": 1, "$vector": 1},
+                    options=options
+                )
+                data = result.get('data', {}) if isinstance(result, dict) else {}
+                docs.extend(data.get('documents', []))
+                page_state = data.get('nextPageState')
+                if not page_state:
+                    break
+
+            vectors = [d.pop('$vector', None) for d in docs]
+            keep = [(d, v) for d, v in zip(docs, vectors) if v]
+            if not keep:
+                print("📝 No vectors found to index")
+                return False
+
+            self.docs = [d for d, _ in keep]
+            matrix = np.asarray([v for _, v in keep], dtype=np.float32)
+            # Normalize rows once so query scoring is a plain dot product
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            # Contiguous float32 rows keep the scoring matmul on the BLAS
+            # fast path
+            self.matrix = np.ascontiguousarray(matrix / norms)
+
+            if self.quantized:
+                # Symmetric per-row quantization with a float scale
+                self.scales = np.abs(self.matrix).max(axis=1) / 127.0
+                self.scales[self.scales == 0] = 1.0
+                self.matrix = np.clip(
+                    np.round(self.matrix / self.scales[:, np.newaxis]), -128, 127
+                ).astype(np.int8)
+
+            print(f"✅ Local index ready with {len(self.docs)} chunk(s)")
+            return True
+
+        except Exception as e:
+            print(f"⚠️  Failed to build local index, falling back to Astra: {e}")
+            return False
+
+    def search(self, query_embedding, limit=5):
+        """Return the most similar mirrored documents with $similarity set"""
+        q = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm:
+            q = q / norm
+
+        if self.quantized:
+            # Integer matmul, then rescale the scores back to cosine space.
+            # Score in row blocks so the int32 widening temporary stays a
+            # few MB - widening the whole matrix per query would move more
+            # bytes than the float32 path this mode exists to beat
+            q_scale = float(np.abs(q).max()) / 127.0 or 1.0
+            q_i32 = np.clip(np.round(q / q_scale), -128, 127).astype(np.int32)
+            sims = np.empty(len(self.matrix), dtype=np.float32)
+            block = 8192
+            for start in range(0, len(self.matrix), block):
+                rows = self.matrix[start:start + block].astype(np.int32)
+                sims[start:start + block] = rows @ q_i32
+            sims *= self.scales * q_scale
+        else:
+            sims = self.matrix @ q
+        if limit < len(sims):
+            # argpartition finds the top k in O(N); only those get sorted
+            top = np.argpartition(-sims, limit)[:limit]
+            top = top[np.argsort(-sims[top])]
+        else:
+            top = np.argsort(-sims)
+
+        docs = self.docs
+        return [dict(docs[idx], **{'$similarity': float(sims[idx])}) for idx in top]
+
+    def save(self, path):
+        """Persist the index so the next session skips the full rebuild"""
+        try:
+            payload = {
+                'matrix': self.matrix,
+                'docs': np.frombuffer(orjson.dumps(self.docs), dtype=np.uint8),
+                'quantized': np.uint8(self.quantized)
+            }
+            if self.scales is not None:
+                payload['scales'] = self.scales
+            np.savez(path, **payload)
+            print(f"💾 Saved local index to {path}")
+        except Exception as e:
+            print(f"⚠️  Failed to save local index: {e}")
+
+    def load(self, path):
+        """Restore a previously saved index; returns True on success"""
+        if not os.path.exists(path):
+            return False
+        try:
+            data = np.load(path)
+            if bool(data['quantized']) != self.quantized:
+                # Storage format changed since the save; rebuild from Astra
+                return False
+            self.matrix = data['matrix']
+            self.scales = data['scales'] if 'scales' in data else None
+            self.docs = orjson.loads(data['docs'].tobytes())
+            print(f"✅ Loaded local index with {len(self.docs)} chunk(s) from {path}")
+            return True
+        except Exception as e:
+            print(f"⚠️  Failed to load local index, rebuilding: {e}")
+            return False
+
+def _local_index_path():
+    """Where the mirrored index is persisted between sessions"""
+    return os.getenv('LOCAL_INDEX_PATH', 'notion_index.npz')
+
+def _use_local_index():
+    """Whether to mirror the collection into a process-local index"""
+    return os.getenv('USE_LOCAL_INDEX', '0') == '1'
+
+def search_similar_pages(collection, query_embedding, limit=5):
+    """Find the chunks most similar to the query embedding
+
+    Args:
+        collection: Astra DB collection holding the chunk documents
+        query_embedding: Embedding vector of the search query
+        limit (int): Maximum number of results
+
+    Returns:
+        list: Result documents sorted by similarity, or [] on failure
+    """
+    try:
+        # Only the fields the result listing displays; without a projection
+        # each hit would drag its stored vector and full metadata along
+        result = collection.find(
+            projection={"page_id": 1, "page_title": 1, "page_url": 1, "chunk_text": 1},
+            sort={"$vector": np.asarray(query_embedding, dtype=np.float32).tolist()},
+            options={"limit": limit, "includeSimilarity": True}
+        )
+
+        if isinstance(result, dict) and 'data' in result:
+            return result['data'].get('documents', [])
+        return result or []
+
+    except Exception as e:
+        print(f"❌ Error searching vector database: {e}")
+        return []
+
+def _format_results(query, results):
+    """Build the printable result listing for a query"""
+    if not results:
+        return f"📝 No results found for '{query}'\n"
+
+    lines = [f"\n🔍 Top {len(results)} result(s) for '{query}':"]
+    append = lines.append  # Bound once; skips the attribute lookup per line
+    for rank, result in enumerate(results, 1):
+        get = result.get
+        title = get('page_title') or "Untitled"
+        similarity = get('$similarity')
+        append(f"\n{rank}. {title}" +
+               (f"  (similarity: {similarity:.3f})" if similarity is not None else ""))
+        url = get('page_url')
+        if url:
+            append(f"   🔗 {url}")
+        content = get('chunk_text') or get('content_text') or ""
+        snippet = content[:200]
+        if snippet:
+            append(f"   {snippet}{'...' if len(content) > 200 else ''}")
+    append("")
+    return "\n".join(lines)
+
+def handle_query(bedrock_client, collection, model_id, query, local_index=None):
+    """Embed one query and return its results, going through every cache tier
+
+    This is the unit of work for both the interactive loop and concurrent
+    callers: embedding LRU, semantic cache, then the local index or Astra.
+    """
+    query_embedding = cached_get_embedding(bedrock_client, query, model_id)
+    if query_embedding is None or not query_embedding.size:
+        return None
+
+    results = _semantic_cache.get(query_embedding)
+    if results is None:
+        if local_index is not None:
+            results = local_index.search(query_embedding)
+        else:
+            results = search_similar_pages(collection, query_embedding)
+        # An empty list also means "Astra errored"; caching it would replay
+        # the failure for every similar query this session
+        if results:
+            _semantic_cache.put(query_embedding, results)
+    return results
+
+def search_many(bedrock_client, collection, model_id, queries, local_index=None, max_workers=8):
+    """Resolve several queries concurrently, preserving input order
+
+    For agent-style callers that pipeline multiple lookups: embedding and
+    Astra round-trips overlap across the pool, so wall time approaches the
+    slowest single query instead of the sum.
+    """
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(queries) or 1)) as executor:
+        return list(executor.map(
+            lambda q: handle_query(bedrock_client, collection, model_id, q, local_index),
+            queries
+        ))
+
+def search_notion_content():
+    """Interactive REPL searching the Notion vector collection"""
+    print("🔎 Notion Vector Search")
+    print("=" * 50)
+
+    cfg = load_environment()
+    if cfg is None:
+        sys.exit(1)
+
+    bedrock_client = create_bedrock_client(cfg.aws_access_key, cfg.aws_secret_key, cfg.aws_region)
+    if not bedrock_client:
+        sys.exit(1)
+
+    db = create_astra_client(cfg.astra_db_endpoint, cfg.astra_db_keyspace,
+                             cfg.astra_db_application_token, cfg.astra_db_name,
+                             cfg.vector_collection_name)
+    if not db:
+        sys.exit(1)
+
+    collection = create_vector_collection(db, cfg.vector_collection_name)
+    if not collection:
+        print("❌ Failed to access vector collection")
+        sys.exit(1)
+
+    local_index = None
+    if _use_local_index():
+        index = LocalVectorIndex()
+        # A saved index loads in milliseconds; rebuilding pages the whole
+        # collection out of Astra, so persist it for the next session
+        if index.load(_local_index_path()):
+            local_index = index
+        elif index.build(collection):
+            index.save(_local_index_path())
+            local_index = index
+
+    print("Type a query, or 'quit' to exit")
+
+    # Cheapest cache of all: re-submitting the same query (a stray Enter,
+    # a retry) replays the previous answer with zero work
+    last_query = None
+    last_results = None
+
+    while True:
+        try:
+            query = input("\n🔍 Search: ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            break
+
+        if not query or query.lower() in ('quit', 'exit'):
+            break
+
+        if query == last_query:
+            print(_format_results(query, last_results))
+            continue
+
+        results = handle_query(bedrock_client, collection, cfg.bedrock_model_id,
+                               query, local_index)
+        if results is None:
+            print("❌ Failed to embed query")
+            continue
+
+        last_query, last_results = query, results
+        print(_format_results(query, results))
+
+def main():
+    """Main function"""
+    search_notion_content()
+
+if __name__ == "__main__":
+    main()